@@ -6,9 +6,17 @@ Uses Groq Whisper for transcription and Claude for summarization.
 """
 from __future__ import annotations
 
+import atexit
 import logging
+import math
+import os
+import tempfile
 import threading
-from flask import Flask, request, abort
+import time
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+import requests
+from flask import Flask, Response, request, abort
 
 from linebot.v3 import WebhookHandler
 from linebot.v3.exceptions import InvalidSignatureError
@@ -16,7 +24,6 @@ from linebot.v3.messaging import (
     Configuration,
     ApiClient,
     MessagingApi,
-    MessagingApiBlob,
     ReplyMessageRequest,
     PushMessageRequest,
     TextMessage,
@@ -42,22 +49,72 @@ logger = logging.getLogger(__name__)
 # Validate configuration
 missing = Config.validate()
 if missing:
-    logger.error(f"Missing required configuration: {missing}")
+    logger.error("Missing required configuration: %s", missing)
     raise EnvironmentError(f"Missing environment variables: {missing}")
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json.compact = True
 
 # Initialize LINE SDK
 configuration = Configuration(access_token=Config.LINE_CHANNEL_ACCESS_TOKEN)
 handler = WebhookHandler(Config.LINE_CHANNEL_SECRET)
 
+# Long-lived API client so outbound calls reuse pooled HTTPS connections
+_api_client = ApiClient(configuration)
+_messaging_api = MessagingApi(_api_client)
+atexit.register(_api_client.close)
+
+# Message content is downloaded directly so it can be streamed to disk
+# (the SDK's blob API buffers the whole body in memory)
+LINE_CONTENT_URL = "https://api-data.line.me/v2/bot/message/{message_id}/content"
+_http_session = requests.Session()
+_http_session.headers["Authorization"] = f"Bearer {Config.LINE_CHANNEL_ACCESS_TOKEN}"
+atexit.register(_http_session.close)
+
+# Downloads up to this size stay in memory, larger ones spill to a temp file
+DOWNLOAD_SPOOL_SIZE = 8 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# LINE accepts at most 5 message objects per push/reply request
+LINE_MAX_MESSAGES_PER_REQUEST = 5
+
 # Initialize services
 password_manager = PasswordManager(Config.DAILY_PASSWORD_SEED)
-transcription_service = TranscriptionService(Config.GROQ_API_KEY)
-summarization_service = SummarizationService(Config.DEEPSEEK_API_KEY)
+transcription_service = TranscriptionService(
+    Config.GROQ_API_KEY,
+    requests_per_minute=Config.GROQ_REQUESTS_PER_MINUTE,
+    audio_seconds_per_hour=Config.GROQ_AUDIO_SECONDS_PER_HOUR,
+)
+atexit.register(transcription_service.close)
+summarization_service = SummarizationService(
+    Config.DEEPSEEK_API_KEY,
+    cache_path=Config.SUMMARY_CACHE_PATH or None,
+)
 document_generator = DocumentGenerator()
 
+# Shared pool for background audio jobs; the semaphore bounds queued + running
+# jobs so a burst is turned away instead of piling up unbounded work
+AUDIO_POOL = ThreadPoolExecutor(max_workers=Config.AUDIO_WORKERS, thread_name_prefix="audio")
+_audio_slots = threading.BoundedSemaphore(Config.AUDIO_MAX_PENDING)
+atexit.register(AUDIO_POOL.shutdown, wait=True)
+
+# Message IDs of recently started audio jobs, so LINE webhook redeliveries
+# don't download, transcribe and summarize the same recording twice
+INFLIGHT_TTL_SECONDS = 600
+INFLIGHT_PRUNE_SIZE = 256
+_inflight: dict[str, float] = {}
+_inflight_lock = threading.Lock()
+
+# Uploaded file types accepted for transcription
+AUDIO_EXTENSIONS = frozenset({
+    ".m4a", ".mp3", ".wav", ".ogg", ".flac", ".mp4", ".mpeg", ".mpga", ".webm",
+})
+
+# Text command that makes the user's next recording skip the summary cache
+NOCACHE_COMMAND = "!nocache"
+_nocache_users: set[str] = set()
+
 
 @app.route("/callback", methods=["POST"])
 def callback():
@@ -85,33 +142,51 @@ def callback():
 @app.route("/health", methods=["GET"])
 def health():
     """Health check endpoint for monitoring."""
-    return {
+    today = password_manager.get_today_date_string()
+    payload = {
         "status": "healthy",
         "active_sessions": password_manager.get_session_count(),
-        "today_password_hint": f"meeting{password_manager.get_today_date_string()[5:7]}{password_manager.get_today_date_string()[8:10]}",
+        "today_password_hint": f"meeting{today[5:7]}{today[8:10]}",
     }
+    return Response(orjson.dumps(payload), mimetype="application/json")
+
+
+def batch_text_messages(text: str) -> list[list[TextMessage]]:
+    """Split text for LINE and group the parts into per-request batches.
+    
+    Args:
+        text: Message text to send
+        
+    Returns:
+        Lists of at most LINE_MAX_MESSAGES_PER_REQUEST messages each
+    """
+    # Fast path: most outgoing messages are short and need no splitting
+    if len(text) <= document_generator.MAX_MESSAGE_LENGTH:
+        return [[TextMessage(text=text)]]
+    
+    chunks = document_generator.split_for_line(text)
+    return [
+        [TextMessage(text=chunk) for chunk in chunks[i:i + LINE_MAX_MESSAGES_PER_REQUEST]]
+        for i in range(0, len(chunks), LINE_MAX_MESSAGES_PER_REQUEST)
+    ]
 
 
 def send_message(user_id: str, text: str):
     """Send a push message to a user.
     
+    Long text is split into several messages, sent up to five per request.
+    
     Args:
         user_id: LINE user ID
         text: Message text to send
     """
-    with ApiClient(configuration) as api_client:
-        messaging_api = MessagingApi(api_client)
-        
-        # Split long messages
-        chunks = document_generator.split_for_line(text)
-        
-        for chunk in chunks:
-            messaging_api.push_message(
-                PushMessageRequest(
-                    to=user_id,
-                    messages=[TextMessage(text=chunk)]
-                )
+    for messages in batch_text_messages(text):
+        _messaging_api.push_message(
+            PushMessageRequest(
+                to=user_id,
+                messages=messages
             )
+        )
 
 
 def reply_message(reply_token: str, text: str):
@@ -121,17 +196,49 @@ def reply_message(reply_token: str, text: str):
         reply_token: LINE reply token
         text: Message text to send
     """
-    with ApiClient(configuration) as api_client:
-        messaging_api = MessagingApi(api_client)
-        messaging_api.reply_message(
-            ReplyMessageRequest(
-                reply_token=reply_token,
-                messages=[TextMessage(text=text)]
-            )
+    # A reply token can only be used once, so only the first batch fits
+    batches = batch_text_messages(text)
+    if len(batches) > 1:
+        logger.warning("Reply too long, dropping %d message batch(es)", len(batches) - 1)
+    
+    _messaging_api.reply_message(
+        ReplyMessageRequest(
+            reply_token=reply_token,
+            messages=batches[0]
         )
+    )
+
+
+def download_message_content(message_id: str) -> tempfile.SpooledTemporaryFile:
+    """Stream a message's content from LINE into a spooled temp file.
+    
+    Args:
+        message_id: LINE message ID
+        
+    Returns:
+        Temp file positioned at the start of the content; caller closes it
+    """
+    audio_file = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_SIZE)
+    try:
+        with _http_session.get(
+            LINE_CONTENT_URL.format(message_id=message_id),
+            stream=True,
+            timeout=60
+        ) as response:
+            response.raise_for_status()
+            for block in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                audio_file.write(block)
+    except Exception:
+        audio_file.close()
+        raise
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Downloaded audio: %d bytes", audio_file.tell())
+    audio_file.seek(0)
+    return audio_file
 
 
-def process_audio_async(user_id: str, message_id: str):
+def process_audio_async(user_id: str, message_id: str, file_extension: str = "m4a"):
     """Process audio message asynchronously.
     
     This is run in a background thread to avoid blocking the webhook response.
@@ -139,28 +246,36 @@ def process_audio_async(user_id: str, message_id: str):
     Args:
         user_id: LINE user ID
         message_id: LINE message ID for the audio
+        file_extension: Audio format extension (LINE voice messages are M4A)
     """
     try:
-        logger.info(f"Starting audio processing for message {message_id}")
+        logger.info("Starting audio processing for message %s", message_id)
         
         # Download audio from LINE
-        with ApiClient(configuration) as api_client:
-            blob_api = MessagingApiBlob(api_client)
-            audio_data = blob_api.get_message_content(message_id)
-        
-        logger.info(f"Downloaded audio: {len(audio_data)} bytes")
+        try:
+            audio_file = download_message_content(message_id)
+        except Exception as e:
+            logger.error("Download failed: %s", e)
+            send_message(user_id, document_generator.create_error_message("download"))
+            return
         
         # Transcribe audio
         try:
-            transcription_result = transcription_service.transcribe(
-                audio_data,
-                file_extension="m4a"  # LINE audio is M4A format
-            )
+            with audio_file:
+                transcription_result = transcription_service.transcribe(
+                    audio_file,
+                    file_extension=file_extension,
+                    on_quota_wait=lambda wait_time: send_message(
+                        user_id,
+                        f"⏳ The transcription quota is used up for now. "
+                        f"Your recording will start in about {math.ceil(wait_time / 60)} min."
+                    )
+                )
             transcript = transcription_result["text"]
             duration = transcription_result.get("duration")
             detected_language = transcription_result.get("language")
         except Exception as e:
-            logger.error(f"Transcription failed: {e}")
+            logger.error("Transcription failed: %s", e)
             send_message(user_id, document_generator.create_error_message("transcription"))
             return
         
@@ -168,16 +283,20 @@ def process_audio_async(user_id: str, message_id: str):
             send_message(user_id, "⚠️ No speech detected in the audio. Please try again with a clearer recording.")
             return
         
-        logger.info(f"Transcription complete: {len(transcript)} chars, language={detected_language}")
+        logger.info("Transcription complete: %d chars, language=%s", len(transcript), detected_language)
         
-        # Generate summary
+        # Generate summary (a pending !nocache applies to this recording only)
+        use_cache = user_id not in _nocache_users
+        _nocache_users.discard(user_id)
         try:
             summary = summarization_service.summarize(
                 transcript,
-                detected_language=detected_language
+                detected_language=detected_language,
+                use_cache=use_cache,
+                user_id=user_id
             )
         except Exception as e:
-            logger.error(f"Summarization failed: {e}")
+            logger.error("Summarization failed: %s", e)
             # Still send the transcript even if summary fails
             send_message(
                 user_id,
@@ -189,23 +308,102 @@ def process_audio_async(user_id: str, message_id: str):
         formatted_document = document_generator.format_for_line(summary, duration)
         send_message(user_id, formatted_document)
         
-        logger.info(f"Successfully processed audio for user {user_id}")
+        logger.info("Successfully processed audio for user %s", user_id)
         
     except Exception as e:
-        logger.error(f"Audio processing failed: {e}")
+        logger.error("Audio processing failed: %s", e)
         send_message(user_id, document_generator.create_error_message("general"))
 
 
+def claim_message(message_id: str) -> bool:
+    """Mark a message as being processed.
+    
+    Args:
+        message_id: LINE message ID
+        
+    Returns:
+        False if the message was already claimed within INFLIGHT_TTL_SECONDS
+    """
+    now = time.monotonic()
+    with _inflight_lock:
+        started = _inflight.get(message_id)
+        if started is not None and now - started < INFLIGHT_TTL_SECONDS:
+            return False
+        
+        # Lazily drop expired entries once the table grows
+        if len(_inflight) > INFLIGHT_PRUNE_SIZE:
+            for key in [k for k, t in _inflight.items() if now - t >= INFLIGHT_TTL_SECONDS]:
+                del _inflight[key]
+        
+        _inflight[message_id] = now
+        return True
+
+
+def release_message(message_id: str):
+    """Drop a claim so a redelivery of the message is processed again.
+    
+    Args:
+        message_id: LINE message ID
+    """
+    with _inflight_lock:
+        _inflight.pop(message_id, None)
+
+
+def start_audio_job(event: MessageEvent, confirmation: str, file_extension: str = "m4a"):
+    """Acknowledge an audio message and queue it for background processing.
+    
+    Replies with a busy notice instead if too many jobs are already pending.
+    
+    Args:
+        event: LINE message event carrying the audio
+        confirmation: Text to reply with once the job is queued
+        file_extension: Audio format extension
+    """
+    if not claim_message(event.message.id):
+        logger.info("Ignoring duplicate delivery of message %s", event.message.id)
+        return
+    
+    if not _audio_slots.acquire(blocking=False):
+        logger.warning("Audio queue full, rejecting message")
+        # Not processed, so a retry of this message must not count as a duplicate
+        release_message(event.message.id)
+        reply_message(
+            event.reply_token,
+            "⚠️ I'm busy processing other recordings. Please try again in a few minutes."
+        )
+        return
+    
+    try:
+        reply_message(event.reply_token, confirmation)
+        future = AUDIO_POOL.submit(
+            process_audio_async, event.source.user_id, event.message.id, file_extension
+        )
+    except Exception:
+        # LINE redelivers after a failed webhook; let that attempt through
+        _audio_slots.release()
+        release_message(event.message.id)
+        raise
+    future.add_done_callback(lambda _: _audio_slots.release())
+
+
 @handler.add(MessageEvent, message=TextMessageContent)
 def handle_text_message(event: MessageEvent):
     """Handle incoming text messages.
     
-    Used for password authentication.
+    Used for password authentication and the !nocache command.
     """
     user_id = event.source.user_id
     text = event.message.text.strip()
     
-    logger.info(f"Received text from {user_id}: {text[:20]}...")
+    logger.info("Received text from %s: %.20s...", user_id, text)
+    
+    if text.lower() == NOCACHE_COMMAND:
+        _nocache_users.add(user_id)
+        reply_message(
+            event.reply_token,
+            "🔄 Your next voice message will get a freshly generated summary."
+        )
+        return
     
     # Check if already authenticated
     if password_manager.is_authenticated(user_id):
@@ -234,7 +432,7 @@ def handle_audio_message(event: MessageEvent):
     user_id = event.source.user_id
     message_id = event.message.id
     
-    logger.info(f"Received audio from {user_id}, message_id: {message_id}")
+    logger.info("Received audio from %s, message_id: %s", user_id, message_id)
     
     # Auth disabled for simpler operation - uncomment to re-enable
     # if not password_manager.is_authenticated(user_id):
@@ -244,18 +442,8 @@ def handle_audio_message(event: MessageEvent):
     #     )
     #     return
     
-    # Send immediate confirmation
-    reply_message(
-        event.reply_token,
-        document_generator.create_processing_message()
-    )
-    
-    # Process audio in background thread
-    thread = threading.Thread(
-        target=process_audio_async,
-        args=(user_id, message_id)
-    )
-    thread.start()
+    # Send immediate confirmation and process audio in the background
+    start_audio_job(event, document_generator.create_processing_message())
 
 
 @handler.add(MessageEvent, message=FileMessageContent)
@@ -268,7 +456,7 @@ def handle_file_message(event: MessageEvent):
     message_id = event.message.id
     file_name = event.message.file_name.lower() if event.message.file_name else ""
     
-    logger.info(f"Received file from {user_id}: {file_name}")
+    logger.info("Received file from %s: %s", user_id, file_name)
     
     # Auth disabled for simpler operation - uncomment to re-enable
     # is_auth = password_manager.is_authenticated(user_id)
@@ -280,33 +468,31 @@ def handle_file_message(event: MessageEvent):
     #     return
     
     # Check if it's an audio file
-    audio_extensions = ('.m4a', '.mp3', '.wav', '.ogg', '.flac', '.mp4', '.mpeg', '.mpga', '.webm')
-    if not file_name.endswith(audio_extensions):
+    ext = os.path.splitext(file_name)[1]
+    if ext not in AUDIO_EXTENSIONS:
         reply_message(
             event.reply_token,
             f"⚠️ Please send an audio file.\n\nSupported formats: M4A, MP3, WAV, OGG, FLAC\n\nReceived: {file_name}"
         )
         return
     
-    # Get file extension for transcription
-    file_ext = file_name.split('.')[-1] if '.' in file_name else 'm4a'
-    
-    # Send immediate confirmation
-    reply_message(
-        event.reply_token,
-        f"📁 File received: {event.message.file_name}\n\n" + document_generator.create_processing_message()
+    # Send immediate confirmation and process audio in the background
+    start_audio_job(
+        event,
+        f"📁 File received: {event.message.file_name}\n\n" + document_generator.create_processing_message(),
+        file_extension=ext[1:]
     )
-    
-    # Process audio in background thread
-    thread = threading.Thread(
-        target=process_audio_async,
-        args=(user_id, message_id)
-    )
-    thread.start()
 
 
 if __name__ == "__main__":
-    logger.info(f"Starting server on port {Config.PORT}")
-    logger.info(f"Today's password: {password_manager.get_today_password()}")
+    # The Werkzeug server is single-process and meant for local debugging;
+    # production runs under gunicorn via wsgi.py
+    if not Config.DEBUG:
+        raise SystemExit(
+            "The built-in server is for local debugging only (set DEBUG=true). "
+            "In production run: gunicorn -k gthread --threads 8 wsgi:app"
+        )
+    logger.info("Starting server on port %s", Config.PORT)
+    logger.info("Today's password: %s", password_manager.get_today_password())
     app.run(host="0.0.0.0", port=Config.PORT, debug=Config.DEBUG)
 
@@ -1,4 +1,7 @@
 """Daily rotating password manager."""
+import hmac
+import threading
+import time
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
@@ -8,11 +11,25 @@ class PasswordManager:
     
     Password format: 'meetingMMDD' (e.g., 'meeting0203' for Feb 3rd)
     Sessions are stored in memory and reset on server restart.
+    
+    Safe to share between the webhook and background worker threads:
+    writers rebuild an immutable snapshot under a lock, readers only
+    load the current snapshot and never block.
     """
     
     # Timezone for Taiwan (UTC+8)
     TW_TIMEZONE = timezone(timedelta(hours=8))
     
+    # UTC offset of TW_TIMEZONE in seconds, for computing the local day number
+    TW_OFFSET_SECONDS = 8 * 3600
+    
+    # Prompt shown to users who haven't entered today's password
+    UNAUTHENTICATED_MESSAGE = (
+        "🔐 Please enter today's password to use this bot.\n\n"
+        "Format: meetingMMDD\n"
+        "Example: meeting0203 (for Feb 3rd)"
+    )
+    
     def __init__(self, seed: str = "default"):
         """Initialize the password manager.
         
@@ -21,9 +38,41 @@ class PasswordManager:
                   but kept for future enhancement)
         """
         self._seed = seed
-        # Store authenticated user IDs with their auth date
-        # Format: {user_id: auth_date_string}
-        self._authenticated_users: dict[str, str] = {}
+        # Serializes writers (authentication and day rollover)
+        self._lock = threading.Lock()
+        # Snapshot of user IDs authenticated today; replaced, never mutated
+        self._today_users: frozenset[str] = frozenset()
+        # Cached (epoch_day, date_string, password, password_lower_bytes) for today
+        self._today_cache: tuple[int, str, str, bytes] | None = None
+    
+    def _refresh_today(self) -> tuple[int, str, str, bytes]:
+        """Return today's cached values, recomputing them only when the day changes.
+        
+        The day number is derived from time.time() alone, so the common case
+        costs no datetime allocation or formatting. On rollover, sessions from
+        previous days are dropped by swapping in an empty snapshot.
+        """
+        timestamp = time.time()
+        epoch_day = int((timestamp + self.TW_OFFSET_SECONDS) // 86400)
+        cache = self._today_cache
+        if cache is not None and cache[0] == epoch_day:
+            return cache
+        
+        with self._lock:
+            # Another thread may have rolled over while we waited
+            cache = self._today_cache
+            if cache is not None and cache[0] == epoch_day:
+                return cache
+            
+            now = datetime.fromtimestamp(timestamp, self.TW_TIMEZONE)
+            password = f"meeting{now.month:02d}{now.day:02d}"
+            
+            # Every stored session predates the new day, so none are valid anymore.
+            # Clear them before publishing the new day so readers never see stale users.
+            self._today_users = frozenset()
+            cache = (epoch_day, now.strftime("%Y-%m-%d"), password, password.lower().encode())
+            self._today_cache = cache
+        return cache
     
     def get_today_password(self) -> str:
         """Generate today's password based on the date.
@@ -31,13 +80,11 @@ class PasswordManager:
         Returns:
             Password string in format 'meetingMMDD'
         """
-        now = datetime.now(self.TW_TIMEZONE)
-        return f"meeting{now.month:02d}{now.day:02d}"
+        return self._refresh_today()[2]
     
     def get_today_date_string(self) -> str:
         """Get today's date as a string for session tracking."""
-        now = datetime.now(self.TW_TIMEZONE)
-        return now.strftime("%Y-%m-%d")
+        return self._refresh_today()[1]
     
     def check_password(self, password: str) -> bool:
         """Check if the provided password matches today's password.
@@ -48,7 +95,9 @@ class PasswordManager:
         Returns:
             True if password matches, False otherwise
         """
-        return password.strip().lower() == self.get_today_password().lower()
+        # Constant-time compare so response timing doesn't leak the password;
+        # bytes because compare_digest rejects non-ASCII str input
+        return hmac.compare_digest(password.strip().lower().encode(), self._refresh_today()[3])
     
     def authenticate_user(self, user_id: str, password: str) -> tuple[bool, str]:
         """Attempt to authenticate a user with a password.
@@ -61,7 +110,8 @@ class PasswordManager:
             Tuple of (success, message)
         """
         if self.check_password(password):
-            self._authenticated_users[user_id] = self.get_today_date_string()
+            with self._lock:
+                self._today_users = self._today_users | {user_id}
             return True, "✅ Authentication successful! You can now send voice messages."
         return False, "❌ Incorrect password. Please try again."
     
@@ -74,21 +124,14 @@ class PasswordManager:
         Returns:
             True if user is authenticated for today, False otherwise
         """
-        auth_date = self._authenticated_users.get(user_id)
-        if not auth_date:
-            return False
-        # Check if auth is still valid (same day)
-        return auth_date == self.get_today_date_string()
+        self._refresh_today()
+        return user_id in self._today_users
     
     def get_unauthenticated_message(self) -> str:
         """Get the message to show unauthenticated users."""
-        return (
-            "🔐 Please enter today's password to use this bot.\n\n"
-            "Format: meetingMMDD\n"
-            "Example: meeting0203 (for Feb 3rd)"
-        )
+        return self.UNAUTHENTICATED_MESSAGE
     
     def get_session_count(self) -> int:
         """Get the number of active sessions."""
-        today = self.get_today_date_string()
-        return sum(1 for date in self._authenticated_users.values() if date == today)
+        self._refresh_today()
+        return len(self._today_users)
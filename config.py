@@ -17,10 +17,22 @@ class Config:
     
     # Groq API (Whisper transcription)
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    # Groq Whisper quota that uploads are paced to (defaults: free tier).
+    # The app runs as one gunicorn worker, so this is the whole account's quota
+    GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", 20))
+    GROQ_AUDIO_SECONDS_PER_HOUR = int(os.getenv("GROQ_AUDIO_SECONDS_PER_HOUR", 7200))
     
     # DeepSeek API (summarization) - OpenAI compatible
     DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
     
+    # Summary cache (SQLite, a user re-sending the same recording reuses its
+    # summary); off unless SUMMARY_CACHE_PATH is set
+    SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "")
+    
+    # Background audio processing: worker threads and max queued + running jobs
+    AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", 8))
+    AUDIO_MAX_PENDING = int(os.getenv("AUDIO_MAX_PENDING", 32))
+    
     # Password configuration
     DAILY_PASSWORD_SEED = os.getenv("DAILY_PASSWORD_SEED", "default_seed")
     
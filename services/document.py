@@ -14,6 +14,59 @@ class DocumentGenerator:
     # Taiwan timezone
     TW_TIMEZONE = timezone(timedelta(hours=8))
     
+    # LINE allows 5000 characters per message; keep room for formatting
+    MAX_MESSAGE_LENGTH = 4500
+    
+    # Line between the summary header and body
+    _SEPARATOR = "─" * 20
+    
+    # Fixed user-facing messages
+    PROCESSING_MESSAGE = (
+        "🎤 Voice message received!\n\n"
+        "⏳ Processing your audio...\n"
+        "• Transcribing speech\n"
+        "• Generating summary\n\n"
+        "This may take a moment for longer recordings."
+    )
+    
+    WELCOME_MESSAGE = (
+        "✅ Welcome to Meeting Summary Bot!\n\n"
+        "📝 How to use:\n"
+        "1. Send a voice message with your meeting recording\n"
+        "2. Wait for the transcription and summary\n"
+        "3. Receive a formatted meeting document\n\n"
+        "🌐 Supported languages: Chinese (中文) & English\n\n"
+        "Ready when you are! 🎤"
+    )
+    
+    # Error messages by error type
+    _ERROR_MESSAGES = {
+        "transcription": (
+            "❌ Transcription Error\n\n"
+            "Sorry, I couldn't transcribe your voice message. "
+            "This might happen if:\n"
+            "• The audio quality is too low\n"
+            "• The file is corrupted\n"
+            "• The audio is too short or silent\n\n"
+            "Please try recording again."
+        ),
+        "summarization": (
+            "❌ Summarization Error\n\n"
+            "I transcribed your audio but couldn't generate a summary. "
+            "Please try again in a moment."
+        ),
+        "download": (
+            "❌ Download Error\n\n"
+            "Sorry, I couldn't download your voice message. "
+            "Please try sending it again."
+        ),
+        "general": (
+            "❌ Error\n\n"
+            "An unexpected error occurred. "
+            "Please try again in a moment."
+        ),
+    }
+    
     def format_for_line(self, summary: str, duration_seconds: float | None = None) -> str:
         """Format the summary for LINE message display.
         
@@ -24,20 +77,19 @@ class DocumentGenerator:
         Returns:
             Formatted string for LINE message
         """
-        # Add header with timestamp
+        # Add header with timestamp and optional duration
         now = datetime.now(self.TW_TIMEZONE)
-        header = f"📋 Meeting Summary\n📅 {now.strftime('%Y-%m-%d %H:%M')}\n"
-        
+        duration_line = ""
         if duration_seconds:
-            minutes = int(duration_seconds // 60)
-            seconds = int(duration_seconds % 60)
-            header += f"⏱️ Duration: {minutes}m {seconds}s\n"
+            minutes, seconds = divmod(int(duration_seconds), 60)
+            duration_line = f"⏱️ Duration: {minutes}m {seconds}s\n"
         
-        header += "─" * 20 + "\n\n"
-        
-        return header + summary
+        return (
+            f"📋 Meeting Summary\n📅 {now:%Y-%m-%d %H:%M}\n"
+            f"{duration_line}{self._SEPARATOR}\n\n{summary}"
+        )
     
-    def split_for_line(self, text: str, max_length: int = 4500) -> list[str]:
+    def split_for_line(self, text: str, max_length: int = MAX_MESSAGE_LENGTH) -> list[str]:
         """Split long text into multiple LINE messages.
         
         LINE has a 5000 character limit per message.
@@ -53,34 +105,67 @@ class DocumentGenerator:
         if len(text) <= max_length:
             return [text]
         
-        chunks = []
-        current_chunk = ""
+        # Split by lines to avoid breaking mid-sentence, wrapping any line
+        # that can't fit in one message on its own
+        lines = [
+            piece
+            for line in text.split("\n")
+            for piece in self._wrap_line(line, max_length - 1)
+        ]
         
-        # Split by lines to avoid breaking mid-sentence
-        lines = text.split("\n")
-        
-        for line in lines:
+        # Find (start, end) line ranges greedily, counting lengths only
+        ranges = []
+        start = 0
+        current_length = 0
+        for i, line in enumerate(lines):
+            line_length = len(line) + 1  # +1 for the newline
             # If adding this line would exceed limit, start new chunk
-            if len(current_chunk) + len(line) + 1 > max_length:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = line + "\n"
-            else:
-                current_chunk += line + "\n"
+            if current_length + line_length > max_length and current_length:
+                ranges.append((start, i))
+                start = i
+                current_length = 0
+            current_length += line_length
+        ranges.append((start, len(lines)))
         
-        # Add the last chunk
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        # Build each chunk with a single join, dropping blank ones
+        chunks = [chunk for s, e in ranges if (chunk := "\n".join(lines[s:e]).strip())]
+        if not chunks:
+            return [text]
         
         # Add part indicators if multiple chunks
         if len(chunks) > 1:
+            total = len(chunks)
             chunks = [
-                f"📄 Part {i+1}/{len(chunks)}\n\n{chunk}"
+                f"📄 Part {i+1}/{total}\n\n{chunk}"
                 for i, chunk in enumerate(chunks)
             ]
         
         return chunks
     
+    @staticmethod
+    def _wrap_line(line: str, width: int) -> list[str]:
+        """Break a line into pieces of at most width characters.
+        
+        Breaks at the last space that fits; text without spaces (e.g.
+        Chinese) is cut at exactly width characters.
+        
+        Args:
+            line: Line of text without newlines
+            width: Maximum characters per piece
+            
+        Returns:
+            The pieces, in order
+        """
+        pieces = []
+        while len(line) > width:
+            cut = line.rfind(" ", 1, width + 1)
+            if cut <= 0:
+                cut = width
+            pieces.append(line[:cut].rstrip())
+            line = line[cut:].lstrip()
+        pieces.append(line)
+        return pieces
+    
     def create_error_message(self, error_type: str) -> str:
         """Create a user-friendly error message.
         
@@ -90,52 +175,12 @@ class DocumentGenerator:
         Returns:
             Formatted error message
         """
-        messages = {
-            "transcription": (
-                "❌ Transcription Error\n\n"
-                "Sorry, I couldn't transcribe your voice message. "
-                "This might happen if:\n"
-                "• The audio quality is too low\n"
-                "• The file is corrupted\n"
-                "• The audio is too short or silent\n\n"
-                "Please try recording again."
-            ),
-            "summarization": (
-                "❌ Summarization Error\n\n"
-                "I transcribed your audio but couldn't generate a summary. "
-                "Please try again in a moment."
-            ),
-            "download": (
-                "❌ Download Error\n\n"
-                "Sorry, I couldn't download your voice message. "
-                "Please try sending it again."
-            ),
-            "general": (
-                "❌ Error\n\n"
-                "An unexpected error occurred. "
-                "Please try again in a moment."
-            ),
-        }
-        return messages.get(error_type, messages["general"])
+        return self._ERROR_MESSAGES.get(error_type, self._ERROR_MESSAGES["general"])
     
     def create_processing_message(self) -> str:
         """Create a message to show while processing."""
-        return (
-            "🎤 Voice message received!\n\n"
-            "⏳ Processing your audio...\n"
-            "• Transcribing speech\n"
-            "• Generating summary\n\n"
-            "This may take a moment for longer recordings."
-        )
+        return self.PROCESSING_MESSAGE
     
     def create_welcome_message(self) -> str:
         """Create a welcome message for authenticated users."""
-        return (
-            "✅ Welcome to Meeting Summary Bot!\n\n"
-            "📝 How to use:\n"
-            "1. Send a voice message with your meeting recording\n"
-            "2. Wait for the transcription and summary\n"
-            "3. Receive a formatted meeting document\n\n"
-            "🌐 Supported languages: Chinese (中文) & English\n\n"
-            "Ready when you are! 🎤"
-        )
+        return self.WELCOME_MESSAGE
@@ -1,12 +1,89 @@
 """Summarization service using DeepSeek API."""
 from __future__ import annotations
 
+import hashlib
 import logging
+import sqlite3
+import threading
+import time
 from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
 
+class _SummaryCache:
+    """Cache of transcript -> summary, persisted in SQLite.
+    
+    Only exact repeats hit: a transcript is keyed by the sha256 of its
+    normalised text, so a re-sent recording reuses its summary instead of
+    paying for another LLM call. Entries are scoped to the user who sent
+    the recording, so one user never sees another's summary.
+    """
+    
+    def __init__(self, path: str):
+        """Open (or create) the cache database.
+        
+        Args:
+            path: SQLite database file path
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_summaries ("
+            "user_id TEXT NOT NULL, "
+            "key TEXT NOT NULL, "
+            "summary TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "PRIMARY KEY (user_id, key))"
+        )
+        self._conn.commit()
+        
+        logger.info(f"Summary cache opened: {path}")
+    
+    @staticmethod
+    def _key(transcript: str) -> str:
+        """Hash the transcript, ignoring case and whitespace differences."""
+        normalized = " ".join(transcript.lower().split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    
+    def lookup(self, user_id: str, transcript: str) -> str | None:
+        """Return this user's cached summary for the same transcript.
+        
+        Args:
+            user_id: Owner of the recording
+            transcript: The meeting transcript text
+            
+        Returns:
+            Cached summary, or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM user_summaries WHERE user_id = ? AND key = ?",
+                (user_id, self._key(transcript))
+            ).fetchone()
+        
+        if row is None:
+            return None
+        logger.info("Summary cache hit")
+        return row[0]
+    
+    def store(self, user_id: str, transcript: str, summary: str):
+        """Insert or replace the summary for a user's transcript.
+        
+        Args:
+            user_id: Owner of the recording
+            transcript: The meeting transcript text
+            summary: The generated summary
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO user_summaries (user_id, key, summary, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (user_id, self._key(transcript), summary, time.time())
+            )
+            self._conn.commit()
+
+
 class SummarizationService:
     """Generates meeting summaries using DeepSeek API.
     
@@ -60,29 +137,37 @@ Instructions:
 [List action items with owners if mentioned, format: - [Action] (Owner: [Name])]
 
 ## 後續步驟 / Next Steps
-[List any follow-up items or next meeting plans]
+[List any follow-up items or next meeting plans]"""
 
----
+    # The transcript is appended verbatim after the model's summary rather
+    # than echoed by the model, which would cost output tokens and risk edits
+    TRANSCRIPT_SECTION = "\n\n---\n\n## 完整逐字稿 / Full Transcript\n\n"
 
-## 完整逐字稿 / Full Transcript
-[Include the original transcript here]"""
+    # Static text around the transcript, so prompts are built with one join
+    # instead of a format() pass over the template
+    _PROMPT_PREFIX, _PROMPT_SUFFIX = SUMMARY_TEMPLATE.split("{transcript}", 1)
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache_path: str | None = None):
         """Initialize the summarization service.
         
         Args:
             api_key: DeepSeek API key
+            cache_path: Optional SQLite path for the summary cache
+                        (caching is disabled if not given)
         """
         self.client = OpenAI(
             api_key=api_key,
             base_url=self.BASE_URL
         )
+        self._cache = _SummaryCache(cache_path) if cache_path else None
     
     def summarize(
         self,
         transcript: str,
         detected_language: str | None = None,
-        additional_context: str | None = None
+        additional_context: str | None = None,
+        use_cache: bool = True,
+        user_id: str | None = None
     ) -> str:
         """Generate a meeting summary from a transcript.
         
@@ -90,20 +175,30 @@ Instructions:
             transcript: The meeting transcript text
             detected_language: Optional language hint from transcription
             additional_context: Optional additional context about the meeting
+            use_cache: Whether a cached summary of the same transcript
+                       may be returned
+            user_id: Owner of the recording; summaries are only cached
+                     and reused per user
             
         Returns:
-            Formatted meeting summary as a string
+            Formatted meeting summary followed by the full transcript
         """
-        # Prepare the prompt
-        prompt = self.SUMMARY_TEMPLATE.format(transcript=transcript)
+        # Context changes the prompt, so only plain transcripts are cached
+        use_cache = use_cache and self._cache is not None and user_id is not None and not additional_context
         
-        # Add language hint if available
-        if detected_language:
-            prompt = f"[Detected language: {detected_language}]\n\n" + prompt
+        if use_cache:
+            cached = self._cache.lookup(user_id, transcript)
+            if cached is not None:
+                return cached + self.TRANSCRIPT_SECTION + transcript
         
-        # Add additional context if provided
+        # Prepare the prompt, with optional context and language hints first
+        parts = []
         if additional_context:
-            prompt = f"[Context: {additional_context}]\n\n" + prompt
+            parts.append(f"[Context: {additional_context}]\n\n")
+        if detected_language and detected_language != "unknown":
+            parts.append(f"[Detected language: {detected_language}]\n\n")
+        parts += (self._PROMPT_PREFIX, transcript, self._PROMPT_SUFFIX)
+        prompt = "".join(parts)
         
         logger.info(f"Generating summary for transcript ({len(transcript)} chars)")
         
@@ -127,11 +222,17 @@ Instructions:
                 f"tokens: {input_tokens} input / {output_tokens} output"
             )
             
-            return summary
-            
         except Exception as e:
             logger.error(f"Summarization failed: {e}")
             raise
+        
+        if use_cache:
+            try:
+                self._cache.store(user_id, transcript, summary)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not cache summary: {e}")
+        
+        return summary + self.TRANSCRIPT_SECTION + transcript
     
     def estimate_cost(self, transcript: str, summary: str) -> dict:
         """Estimate the cost of a summarization request.
@@ -1,48 +1,328 @@
-"""Transcription service using Groq Whisper API with parallel chunking."""
+"""Transcription service using Groq Whisper API with concurrent chunking."""
 from __future__ import annotations
 
+import asyncio
+import io
+import mimetypes
 import tempfile
 import logging
+import math
 import subprocess
 import os
+import random
+import re
+import shutil
+import string
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import aclosing
+from itertools import islice
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from groq import Groq
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, Iterable, Iterator
+
+import httpx
+from groq import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncGroq,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+    RateLimitError,
+)
+from mutagen import File as MutagenFile
 
 logger = logging.getLogger(__name__)
 
 # Maximum file size for Groq free tier (25MB)
 MAX_FILE_SIZE = 25 * 1024 * 1024  # 25MB in bytes
 
-# Chunk duration in seconds (25 minutes = much fewer chunks)
+# Default longest chunk in seconds (25 minutes = much fewer chunks); chunks
+# are sized evenly up to this length
 CHUNK_DURATION = 1500  # 25 minutes
 
-# Max parallel workers (keep low to avoid rate limits)
+# Default max parallel workers (keep low to avoid rate limits)
 MAX_WORKERS = 2
 
+# Upload encoding: Whisper works on 16 kHz mono internally, so low-bitrate
+# Opus speech loses nothing it would use and is a fraction of the size
+COMPRESSED_AUDIO_ARGS = [
+    # Only the first audio stream: video and cover art would otherwise be
+    # re-encoded (as Theora in .ogg) for nothing
+    '-map', '0:a:0',
+    '-ac', '1', '-ar', '16000',
+    '-c:a', 'libopus', '-b:a', '24k', '-application', 'voip'
+]
+
+# ffmpeg prints only errors and no progress, so its stderr stays small
+FFMPEG = ['ffmpeg', '-y', '-loglevel', 'error', '-nostats']
+
+# Cut points are moved into the longest pause within this many seconds of
+# the planned cut, so chunks start and end between words. A pause is at
+# least SILENCE_MIN_DURATION seconds quieter than SILENCE_NOISE.
+SILENCE_SEARCH_WINDOW = 2.0
+SILENCE_NOISE = '-35dB'
+SILENCE_MIN_DURATION = 0.1
+_SILENCE_PATTERN = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+# Seconds each chunk overlaps the previous one, so words cut at a chunk
+# boundary are heard whole in at least one chunk
+CHUNK_OVERLAP = 1.0
+
+# Words compared on each side of a chunk seam, and the shortest shared run
+# accepted as the overlap (a CJK character counts as half a word, so CJK
+# needs four shared characters)
+OVERLAP_MATCH_WORDS = 20
+MIN_OVERLAP_MATCH = 2
+
+# The shared run must end this close to the end of the earlier chunk and
+# start this close to the start of the next one (in tokens); words at the
+# very edge of a chunk are often clipped or misheard
+OVERLAP_EDGE_SLACK = 2
+
+# Tokens for seam matching: single CJK characters (written without spaces)
+# or runs of any other non-space characters
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_PATTERN = re.compile(f"[{_CJK}]|[^\\s{_CJK}]+")
+_CJK_CHAR = re.compile(f"[{_CJK}]")
+_TOKEN_STRIP = string.punctuation + "，。！？、；：「」『』（）"
+
+# Retry backoff when rate limited without a usable reset header (seconds)
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 32.0
+RETRY_JITTER = 1.0
+
+# Uploads run at most this many chunks ahead of the earliest unfinished one,
+# bounding how many results wait out of order for their seam to be merged
+CHUNK_WINDOW = 8
+
+# Default Groq Whisper quota (free tier): requests per minute and seconds
+# of audio per hour. Each request is billed for at least 10s of audio.
+REQUESTS_PER_MINUTE = 20
+AUDIO_SECONDS_PER_HOUR = 7200
+MIN_BILLED_AUDIO_SECONDS = 10.0
+
+# Quota waits at least this long are logged as warnings and reported to
+# transcribe()'s on_quota_wait callback
+QUOTA_NOTICE_SECONDS = 30.0
+
+# Units used in Groq's x-ratelimit-reset-* headers, e.g. "2m59.56s", "500ms"
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def _parse_reset_seconds(value: str | None) -> float | None:
+    """Parse a rate-limit reset header value into seconds.
+    
+    Accepts plain seconds ("12", as in Retry-After) and Groq's
+    unit-suffixed durations ("2m59.56s", "7.66s", "500ms").
+    
+    Returns:
+        Seconds, or None if the value is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    
+    total = 0.0
+    number = ""
+    i = 0
+    while i < len(value):
+        char = value[i]
+        if char.isdigit() or char == ".":
+            number += char
+            i += 1
+            continue
+        unit = "ms" if value.startswith("ms", i) else char
+        if unit not in _DURATION_UNITS or not number:
+            return None
+        try:
+            total += float(number) * _DURATION_UNITS[unit]
+        except ValueError:
+            return None
+        number = ""
+        i += len(unit)
+    
+    return None if number else total
+
+
+def _merge_overlap(prev: str, curr: str) -> tuple[str, str]:
+    """Find the seam between two overlapping chunk transcripts.
+    
+    The overlapping audio shows up as a run of words that ends prev and
+    begins curr (give or take OVERLAP_EDGE_SLACK clipped edge words); the
+    longest such run is kept only once, along with anything either side
+    of it. A shared phrase elsewhere in the windows is not an overlap.
+    
+    Args:
+        prev: Transcript of the earlier chunk
+        curr: Transcript of the next chunk
+        
+    Returns:
+        (head, tail) with head + tail being the merged text; tail is the
+        part of curr from the seam on. Without a clear overlap the two are
+        kept whole, separated by a blank line.
+    """
+    prev_tokens = list(_TOKEN_PATTERN.finditer(prev))[-OVERLAP_MATCH_WORDS:]
+    curr_tokens = list(islice(_TOKEN_PATTERN.finditer(curr), OVERLAP_MATCH_WORDS))
+    prev_words = [m.group().lower().strip(_TOKEN_STRIP) for m in prev_tokens]
+    curr_words = [m.group().lower().strip(_TOKEN_STRIP) for m in curr_tokens]
+    
+    # (weight, start in prev_tokens, start in curr_tokens) of the best run
+    best = None
+    for skip_end in range(min(OVERLAP_EDGE_SLACK, len(prev_words)) + 1):
+        end = len(prev_words) - skip_end
+        for skip_start in range(min(OVERLAP_EDGE_SLACK, len(curr_words)) + 1):
+            longest = min(end, len(curr_words) - skip_start)
+            for size in range(longest, 0, -1):
+                run = curr_words[skip_start:skip_start + size]
+                if prev_words[end - size:end] == run:
+                    weight = sum(0.5 if _CJK_CHAR.fullmatch(word) else 1.0 for word in run if word)
+                    if best is None or weight > best[0]:
+                        best = (weight, end - size, skip_start)
+                    break
+    
+    if best is None or best[0] < MIN_OVERLAP_MATCH:
+        return prev + "\n\n", curr
+    
+    _, prev_start, curr_start = best
+    return prev[:prev_tokens[prev_start].start()], curr[curr_tokens[curr_start].start():]
+
+
+class _TokenBucket:
+    """Async token bucket that refills continuously at capacity per period.
+    
+    Waiters are served first come, first served. Used on a single event
+    loop, so no thread locking is needed.
+    """
+    
+    def __init__(self, capacity: float, period: float):
+        """Start with a full bucket.
+        
+        Args:
+            capacity: Most tokens the bucket holds
+            period: Seconds taken to refill from empty
+        """
+        self.capacity = capacity
+        self._rate = capacity / period
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    def pause(self, seconds: float):
+        """Hold back every acquire() for at least this many seconds."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+    
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Wait until amount tokens are available, then take them.
+        
+        An amount larger than capacity waits for a full bucket and leaves
+        it in debt, delaying later callers.
+        
+        Returns:
+            Seconds spent waiting
+        """
+        started = time.monotonic()
+        async with self._lock:
+            while (wait_time := self.wait_time(amount)) > 0:
+                await asyncio.sleep(wait_time)
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate) - amount
+            self._updated = now
+        return time.monotonic() - started
+    
+    def wait_time(self, amount: float = 1.0) -> float:
+        """Estimate how long acquire(amount) would wait, ignoring queued callers."""
+        now = time.monotonic()
+        tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate)
+        return max(0.0, self._paused_until - now, (min(amount, self.capacity) - tokens) / self._rate)
+
 
 class TranscriptionService:
     """Transcribes audio files using Groq's Whisper API.
     
     Uses Whisper Large V3 Turbo model for fast, accurate transcription.
     Supports Chinese (Mandarin) and English languages.
-    Automatically chunks large files and processes them in PARALLEL.
+    Automatically chunks large files and uploads them CONCURRENTLY
+    from a single asyncio event loop.
+    
+    One AsyncGroq client and its connection pool live for the life of the
+    service, on a background event loop shared by every transcribe() call.
     """
     
     # Groq Whisper model - turbo is faster and cheaper
     MODEL = "whisper-large-v3-turbo"
     
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        chunk_duration: int = CHUNK_DURATION,
+        max_workers: int = MAX_WORKERS,
+        requests_per_minute: int = REQUESTS_PER_MINUTE,
+        audio_seconds_per_hour: int = AUDIO_SECONDS_PER_HOUR
+    ):
         """Initialize the transcription service.
         
         Args:
             api_key: Groq API key
+            chunk_duration: Longest chunk in seconds when splitting large files
+            max_workers: Most chunk uploads in flight at once (1 = one at a time)
+            requests_per_minute: Groq request quota to pace uploads to
+            audio_seconds_per_hour: Groq audio quota to pace uploads to
         """
         self.api_key = api_key
-        self.client = Groq(api_key=api_key)
+        self.chunk_duration = chunk_duration
+        self.max_workers = max_workers
+        # Connection pool sized so concurrent uploads reuse warm keep-alive
+        # connections instead of each paying a TLS handshake
+        # The SDK's own retries are off: _transcribe_single retries 429s itself
+        # and counts every request against the rate-limit buckets
+        self.client = AsyncGroq(
+            api_key=api_key,
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(
+                max_keepalive_connections=max_workers * 2,
+                max_connections=max_workers * 4,
+            ))
+        )
+        # Event loop the client is used on, started by the first transcribe()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_lock = threading.Lock()
+        # Uploads are paced to the quota up front instead of running into
+        # 429s; response headers pause the request bucket when quota runs out
+        self._request_bucket = _TokenBucket(requests_per_minute, 60.0)
+        self._audio_bucket = _TokenBucket(audio_seconds_per_hour, 3600.0)
     
-    def _get_audio_duration(self, file_path: Path) -> float | None:
-        """Get audio duration using ffprobe if available."""
+    def _get_audio_duration(self, audio: Path | bytes | BinaryIO) -> float | None:
+        """Get audio duration from the container header, or ffprobe if that fails.
+        
+        Args:
+            audio: Path to an audio file, or the audio itself in memory
+                   (ffprobe is only tried for files on disk)
+        """
+        # Reading the header in-process avoids spawning ffprobe
+        try:
+            if isinstance(audio, Path):
+                info = MutagenFile(str(audio))
+            elif isinstance(audio, bytes):
+                info = MutagenFile(io.BytesIO(audio))
+            else:
+                try:
+                    info = MutagenFile(audio)
+                finally:
+                    audio.seek(0)
+            if info is not None and info.info.length:
+                return float(info.info.length)
+        except Exception as e:
+            logger.warning(f"Could not get duration with mutagen: {e}")
+        
+        if not isinstance(audio, Path):
+            return None
+        file_path = audio
         try:
             result = subprocess.run(
                 [
@@ -50,7 +330,8 @@ class TranscriptionService:
                     'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1',
                     str(file_path)
                 ],
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 text=True,
                 timeout=30
             )
@@ -60,117 +341,270 @@ class TranscriptionService:
             logger.warning(f"Could not get duration with ffprobe: {e}")
         return None
     
-    def _split_audio(self, file_path: Path, chunk_duration: int = CHUNK_DURATION) -> list[Path]:
-        """Split audio into chunks using ffmpeg (fast, no re-encoding).
+    def _compress_audio(self, file_path: Path) -> Path | None:
+        """Re-encode audio to 24 kbps mono Opus for upload.
         
         Args:
             file_path: Path to the audio file
-            chunk_duration: Duration of each chunk in seconds
-            
+        
         Returns:
-            List of paths to chunk files
+            Path of the compressed .ogg file next to the input, or None if
+            ffmpeg failed
         """
-        chunks = []
-        temp_dir = Path(tempfile.mkdtemp())
+        output_path = file_path.with_name(f"{file_path.stem}.16k.ogg")
+        try:
+            result = subprocess.run(
+                [*FFMPEG, '-i', str(file_path), *COMPRESSED_AUDIO_ARGS, str(output_path)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=600
+            )
+            if result.returncode == 0 and output_path.exists():
+                logger.info(f"Compressed audio: {output_path.stat().st_size / 1024 / 1024:.2f}MB")
+                return output_path
+            logger.warning(f"Compression failed, using original file: {result.stderr.decode(errors='replace').strip()[-200:]}")
+        except Exception as e:
+            logger.warning(f"Compression failed, using original file: {e}")
+        output_path.unlink(missing_ok=True)
+        return None
+    
+    def _snap_to_silence(self, file_path: Path, target: float) -> float:
+        """Move a cut point to the middle of the longest nearby pause.
         
+        Only the few seconds around the cut are decoded, using ffmpeg's
+        silencedetect filter.
+        
+        Args:
+            file_path: Path to the audio file
+            target: Planned cut point in seconds
+        
+        Returns:
+            The snapped cut point, or target if no pause was found
+        """
+        window_start = max(0.0, target - SILENCE_SEARCH_WINDOW)
+        window_length = target + SILENCE_SEARCH_WINDOW - window_start
         try:
-            # Get total duration
-            duration = self._get_audio_duration(file_path)
-            if not duration:
-                logger.warning("Could not determine audio duration, using original file")
-                return [file_path]
-            
-            # Calculate number of chunks needed
-            num_chunks = int(duration // chunk_duration) + (1 if duration % chunk_duration > 0 else 0)
-            
-            logger.info(f"Audio: {duration/60:.1f} min, splitting into {num_chunks} chunks of {chunk_duration/60:.0f} min each")
-            
-            if num_chunks == 1:
-                return [file_path]
-            
-            # Get file extension
-            ext = file_path.suffix or '.m4a'
+            result = subprocess.run(
+                [
+                    'ffmpeg', '-hide_banner', '-nostats',
+                    '-ss', str(window_start), '-t', str(window_length), '-i', str(file_path),
+                    '-af', f'silencedetect=noise={SILENCE_NOISE}:d={SILENCE_MIN_DURATION}',
+                    '-f', 'null', '-'
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=30
+            )
+        except Exception as e:
+            logger.warning(f"Silence detection failed at {target:.0f}s: {e}")
+            return target
+        if result.returncode != 0:
+            return target
+        
+        # Timestamps are relative to the window; a pause still open at either
+        # edge is clipped to the window
+        silences = []
+        silence_start = None
+        for kind, value in _SILENCE_PATTERN.findall(result.stderr):
+            if kind == "start":
+                silence_start = max(0.0, float(value))
+            else:
+                silences.append((silence_start or 0.0, float(value)))
+                silence_start = None
+        if silence_start is not None:
+            silences.append((silence_start, window_length))
+        
+        if not silences:
+            return target
+        start, end = max(silences, key=lambda s: s[1] - s[0])
+        return window_start + (start + end) / 2
+    
+    def _plan_chunks(self, file_path: Path, chunk_duration: int = CHUNK_DURATION) -> list[tuple[float, float]]:
+        """Plan where to cut the audio into chunks.
+        
+        Uses as few chunks as fit within chunk_duration and makes them all
+        the same length, so no short tail chunk costs an extra request and
+        parallel chunks finish together. Each cut is snapped to a nearby
+        pause, and every chunk after the first starts CHUNK_OVERLAP seconds
+        early.
+        
+        Args:
+            file_path: Path to the audio file
+            chunk_duration: Longest allowed chunk in seconds
+        
+        Returns:
+            (start, length) in seconds for each chunk; empty if the audio
+            can't or needn't be split
+        """
+        # Get total duration
+        duration = self._get_audio_duration(file_path)
+        if not duration:
+            logger.warning("Could not determine audio duration, using original file")
+            return []
+        
+        # Calculate number of chunks needed, then spread the audio evenly
+        # across them (+1s so rounding never leaves the end uncovered)
+        num_chunks = max(1, math.ceil(duration / chunk_duration))
+        if num_chunks == 1:
+            return []
+        chunk_duration = math.ceil(duration / num_chunks) + 1
+        
+        logger.info(f"Audio: {duration/60:.1f} min, splitting into {num_chunks} chunks of {chunk_duration/60:.1f} min each")
+        
+        cuts = [self._snap_to_silence(file_path, i * chunk_duration) for i in range(1, num_chunks)]
+        starts = [0.0, *cuts]
+        ends = [*cuts, duration]
+        
+        plan = []
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            overlap = CHUNK_OVERLAP if i > 0 else 0.0
+            plan.append((start - overlap, end - start + overlap))
+        return plan
+    
+    def _iter_split_audio(
+        self,
+        file_path: Path,
+        plan: list[tuple[float, float]],
+        output_dir: Path
+    ) -> Iterator[Path | None]:
+        """Cut planned chunks with ffmpeg (fast, no re-encoding), one at a time.
+        
+        Each chunk is yielded as soon as it is written, so it can be uploaded
+        while later chunks are still being cut. Chunks are cut with input
+        seeking, so ffmpeg reads only that chunk's span of the file rather
+        than everything before it.
+        
+        Args:
+            file_path: Path to the audio file
+            plan: (start, length) in seconds for each chunk
+            output_dir: Directory to write chunk files to
+        
+        Yields:
+            Path of each chunk in order, or None for a chunk that could not
+            be extracted
+        """
+        # Get file extension
+        ext = file_path.suffix or '.m4a'
+        num_chunks = len(plan)
+        
+        for i, (start_time, length) in enumerate(plan):
+            output_path = output_dir / f"chunk_{i:03d}{ext}"
+            # The last chunk runs to the end so nothing is lost to rounding
+            limit = ['-t', str(length)] if i < num_chunks - 1 else []
             
-            # Split using ffmpeg with stream copy (FAST - no re-encoding)
-            for i in range(num_chunks):
-                start_time = i * chunk_duration
-                output_path = temp_dir / f"chunk_{i:03d}{ext}"
+            try:
+                result = subprocess.run(
+                    [
+                        *FFMPEG,
+                        # Seeking before -i jumps straight to the offset via the
+                        # container index instead of demuxing from the start
+                        '-ss', str(start_time), '-i', str(file_path),
+                        *limit,
+                        '-map', '0:a:0',  # Audio only; drop video and cover art
+                        '-c', 'copy',  # Stream copy = FAST, no re-encoding
+                        '-avoid_negative_ts', 'make_zero',
+                        str(output_path)
+                    ],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    timeout=60
+                )
                 
-                try:
-                    result = subprocess.run(
-                        [
-                            'ffmpeg', '-y', '-i', str(file_path),
-                            '-ss', str(start_time), '-t', str(chunk_duration),
-                            '-c', 'copy',  # Stream copy = FAST, no re-encoding
-                            '-avoid_negative_ts', 'make_zero',
-                            str(output_path)
-                        ],
-                        capture_output=True,
-                        timeout=60
-                    )
-                    
-                    if result.returncode == 0 and output_path.exists():
-                        size_kb = output_path.stat().st_size / 1024
-                        chunks.append(output_path)
-                        logger.info(f"Chunk {i+1}/{num_chunks}: {size_kb:.0f}KB")
-                    else:
-                        # If stream copy fails, try with re-encoding
-                        logger.warning(f"Stream copy failed for chunk {i}, trying with re-encode")
-                        result = subprocess.run(
-                            [
-                                'ffmpeg', '-y', '-i', str(file_path),
-                                '-ss', str(start_time), '-t', str(chunk_duration),
-                                '-c:a', 'aac', '-b:a', '64k',
-                                str(output_path)
-                            ],
-                            capture_output=True,
-                            timeout=120
-                        )
-                        if result.returncode == 0 and output_path.exists():
-                            chunks.append(output_path)
-                        
-                except Exception as e:
-                    logger.error(f"Error creating chunk {i}: {e}")
+                if result.returncode == 0 and output_path.exists():
+                    size_kb = output_path.stat().st_size / 1024
+                    logger.info(f"Chunk {i+1}/{num_chunks}: {size_kb:.0f}KB")
+                    yield output_path
+                    continue
+                
+                # If stream copy fails, try with re-encoding
+                logger.warning(
+                    f"Stream copy failed for chunk {i}, trying with re-encode: "
+                    f"{result.stderr.decode(errors='replace').strip()[-200:]}"
+                )
+                output_path.unlink(missing_ok=True)
+                output_path = output_path.with_suffix('.ogg')
+                result = subprocess.run(
+                    [
+                        *FFMPEG,
+                        '-ss', str(start_time), '-i', str(file_path),
+                        *limit,
+                        *COMPRESSED_AUDIO_ARGS,
+                        str(output_path)
+                    ],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    timeout=120
+                )
+                if result.returncode == 0 and output_path.exists():
+                    yield output_path
+                    continue
+                logger.error(f"Re-encode failed for chunk {i}: {result.stderr.decode(errors='replace').strip()[-200:]}")
             
-            return chunks if chunks else [file_path]
+            except Exception as e:
+                logger.error(f"Error creating chunk {i}: {e}")
             
-        except Exception as e:
-            logger.error(f"Audio splitting failed: {e}")
-            return [file_path]
+            yield None
     
-    def _transcribe_single(
+    async def _transcribe_single(
         self,
-        file_path: Path,
+        client: AsyncGroq,
+        file_source: Path | tuple[str, bytes | BinaryIO, str],
         chunk_index: int,
         total_chunks: int,
         language: str | None = None,
+        audio_seconds: float | None = None,
         max_retries: int = 3
     ) -> dict:
-        """Transcribe a single audio file with retry logic for rate limits."""
-        import time
-        import re
-        
-        # Create a new client for this thread (thread safety)
-        client = Groq(api_key=self.api_key)
+        """Transcribe a single audio file with retry logic for rate limits and transient errors.
         
+        Args:
+            client: Groq client to send the request with
+            file_source: Path of an audio file on disk (read once), or an in-memory
+                         (filename, content, content_type) upload tuple
+            chunk_index: Position of this chunk in the recording
+            total_chunks: Number of chunks in the recording
+            language: Optional language hint
+            audio_seconds: Length of the audio, charged to the audio quota
+            max_retries: Retries allowed after rate-limit, connection and 5xx errors
+        """
         params = {
             "model": self.MODEL,
+            # verbose_json is the format that reports the detected language
             "response_format": "verbose_json",
         }
         
         if language:
             params["language"] = language
         
+        # Read a chunk from disk once; retries re-send the same buffer
+        if isinstance(file_source, Path):
+            content_type = mimetypes.guess_type(file_source.name)[0] or "application/octet-stream"
+            file_source = (file_source.name, await asyncio.to_thread(file_source.read_bytes), content_type)
+        
+        waited = await self._audio_bucket.acquire(max(audio_seconds or 0.0, MIN_BILLED_AUDIO_SECONDS))
+        if waited >= QUOTA_NOTICE_SECONDS:
+            logger.warning(f"⏳ Waited {waited:.0f}s for audio quota before chunk {chunk_index + 1}")
+        elif waited > 1:
+            logger.info(f"⏳ Waited {waited:.0f}s for audio quota before chunk {chunk_index + 1}")
+        
         for attempt in range(max_retries + 1):
             try:
-                logger.info(f"🎤 Transcribing chunk {chunk_index + 1}/{total_chunks}..." + 
+                logger.info(f"🎤 Transcribing chunk {chunk_index + 1}/{total_chunks}..." +
                            (f" (retry {attempt})" if attempt > 0 else ""))
                 
-                with open(file_path, "rb") as audio_file:
-                    response = client.audio.transcriptions.create(
-                        file=audio_file,
-                        **params
-                    )
+                await self._request_bucket.acquire()
+                
+                # File objects were consumed by any earlier attempt
+                content = file_source[1]
+                if not isinstance(content, bytes):
+                    content.seek(0)
+                raw_response = await client.audio.transcriptions.with_raw_response.create(
+                    file=file_source,
+                    **params
+                )
+                response = raw_response.parse()
+                self._record_rate_limits(raw_response.headers)
                 
                 logger.info(f"✅ Chunk {chunk_index + 1}/{total_chunks} done!")
                 
@@ -180,117 +614,420 @@ class TranscriptionService:
                     "language": getattr(response, "language", "unknown"),
                     "duration": getattr(response, "duration", None),
                 }
-                
+            
             except Exception as e:
-                error_str = str(e)
+                if isinstance(e, RateLimitError) and attempt < max_retries:
+                    wait_time = self._retry_delay(e.response.headers, attempt)
+                    logger.warning(f"⏳ Rate limited on chunk {chunk_index + 1}, waiting {wait_time:.1f}s...")
+                    # Hold back the other chunks too rather than let them hit the same 429
+                    self._request_bucket.pause(wait_time)
+                    continue
                 
-                # Check if it's a rate limit error
-                if "429" in error_str or "rate_limit" in error_str.lower():
-                    # Try to extract wait time from error message
-                    wait_match = re.search(r'try again in (\d+)m?([\d.]+)?s?', error_str)
-                    if wait_match:
-                        minutes = int(wait_match.group(1)) if wait_match.group(1) else 0
-                        seconds = float(wait_match.group(2)) if wait_match.group(2) else 0
-                        wait_time = minutes * 60 + seconds + 5  # Add 5 sec buffer
-                    else:
-                        wait_time = 60 * (attempt + 1)  # Exponential: 60s, 120s, 180s
-                    
-                    if attempt < max_retries:
-                        logger.warning(f"⏳ Rate limited on chunk {chunk_index + 1}, waiting {wait_time:.0f}s...")
-                        time.sleep(wait_time)
-                        continue
+                if isinstance(e, (APIConnectionError, APITimeoutError, InternalServerError)) and attempt < max_retries:
+                    # Dropped connections, timeouts and 5xx replies are usually brief
+                    wait_time = self._retry_delay({}, attempt)
+                    logger.warning(f"⚠️ Chunk {chunk_index + 1} hit {type(e).__name__}, retrying in {wait_time:.1f}s...")
+                    await asyncio.sleep(wait_time)
+                    continue
                 
-                # If not rate limit or max retries exceeded, raise
+                # If not retryable or max retries exceeded, raise
                 logger.error(f"❌ Chunk {chunk_index + 1} failed after {attempt + 1} attempts: {e}")
                 raise
     
+    @staticmethod
+    def _retry_delay(headers, attempt: int) -> float:
+        """Work out how long to wait before retrying a failed request.
+        
+        Prefers the server's Retry-After / reset headers, which say exactly
+        when quota refills; otherwise backs off exponentially. Jitter keeps
+        concurrent chunks from retrying in lockstep.
+        """
+        delay = _parse_reset_seconds(headers.get("retry-after"))
+        if delay is None:
+            delay = _parse_reset_seconds(headers.get("x-ratelimit-reset-requests"))
+        if delay is None:
+            delay = min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+        return delay + random.random() * RETRY_JITTER
+    
+    def _record_rate_limits(self, headers):
+        """Pause the request bucket until reset if a response says quota is nearly gone."""
+        try:
+            remaining = int(headers.get("x-ratelimit-remaining-requests"))
+        except (TypeError, ValueError):
+            return
+        # Requests already in flight may use up what is left
+        if remaining >= self.max_workers:
+            return
+        reset = _parse_reset_seconds(headers.get("x-ratelimit-reset-requests")) or 0.0
+        if reset > 0:
+            logger.info(f"⏳ Only {remaining} requests left, pausing {reset:.1f}s for reset...")
+            self._request_bucket.pause(reset)
+    
+    async def _iter_transcribe(
+        self,
+        sources: Iterable[Path | tuple[str, bytes | BinaryIO, str] | None],
+        total_chunks: int,
+        language: str | None = None,
+        spans: list[tuple[float, float | None]] | None = None
+    ) -> AsyncIterator[dict]:
+        """Transcribe chunks concurrently, yielding each result as it completes.
+        
+        Sources are pulled from a worker thread, so a blocking iterator (such
+        as _iter_split_audio) keeps producing chunks while earlier ones are
+        already uploading. At most max_workers uploads are in flight at once,
+        all sharing the service's client connection pool, and none starts
+        more than CHUNK_WINDOW chunks ahead of the earliest unfinished one.
+        A failed chunk is replaced by a placeholder so the rest of a long
+        recording is still returned.
+        
+        Args:
+            sources: Audio files or upload tuples in playback order
+                     (None marks a chunk that could not be produced)
+            total_chunks: Number of chunks in the recording, for progress logging
+            language: Optional language hint
+            spans: (start, length) of every chunk in the recording, if known
+            
+        Yields:
+            Results in completion order, each with its chunk 'index'
+        """
+        semaphore = asyncio.Semaphore(self.max_workers)
+        # Chunks finished past lowest_unfinished are held in finished_ahead
+        # until the gap before them closes and the window can slide
+        window = max(CHUNK_WINDOW, self.max_workers)
+        window_moved = asyncio.Condition()
+        finished_ahead = set()
+        lowest_unfinished = 0
+        loop = asyncio.get_running_loop()
+        # Carries ("source", ...) and ("end", None) from the producer thread,
+        # and ("done", (index, outcome)) from finished uploads
+        events: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+        
+        def produce():
+            try:
+                for source in sources:
+                    if stopped.is_set():
+                        break
+                    loop.call_soon_threadsafe(events.put_nowait, ("source", source))
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, ("end", None))
+        
+        producer = loop.run_in_executor(None, produce)
+        
+        async def transcribe_bounded(index: int, source):
+            nonlocal lowest_unfinished
+            try:
+                if source is None:
+                    raise RuntimeError("chunk could not be extracted")
+                async with window_moved:
+                    await window_moved.wait_for(lambda: index < lowest_unfinished + window)
+                async with semaphore:
+                    outcome = await self._transcribe_single(
+                        self.client, source, index, total_chunks, language,
+                        audio_seconds=spans[index][1] if spans else None
+                    )
+            except Exception as e:
+                outcome = e
+            
+            # Slide the window past every chunk now finished in playback order
+            finished_ahead.add(index)
+            while lowest_unfinished in finished_ahead:
+                finished_ahead.remove(lowest_unfinished)
+                lowest_unfinished += 1
+            async with window_moved:
+                window_moved.notify_all()
+            events.put_nowait(("done", (index, outcome)))
+        
+        # Start each upload as soon as its chunk is ready
+        tasks = []
+        finished = 0
+        sources_done = False
+        try:
+            while not sources_done or finished < len(tasks):
+                kind, value = await events.get()
+                if kind == "source":
+                    tasks.append(asyncio.create_task(transcribe_bounded(len(tasks), value)))
+                elif kind == "end":
+                    sources_done = True
+                else:
+                    finished += 1
+                    chunk_index, outcome = value
+                    if not isinstance(outcome, BaseException):
+                        yield outcome
+                        continue
+                    
+                    # Single file: nothing to salvage, surface the error
+                    if total_chunks == 1:
+                        raise outcome
+                    
+                    logger.error(f"❌ Chunk {chunk_index} failed: {outcome}")
+                    yield {
+                        "index": chunk_index,
+                        "text": f"[Chunk {chunk_index + 1} failed: {str(outcome)[:50]}]",
+                        "language": "unknown",
+                        "duration": None
+                    }
+            
+            await producer
+        finally:
+            # Stop work nobody is waiting for any more, letting a chunk that
+            # is mid-cut finish before its directory can be removed
+            stopped.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.wait([producer])
+    
+    async def _stream_chunks(
+        self,
+        sources: Iterable[Path | tuple[str, bytes | BinaryIO, str] | None],
+        spans: list[tuple[float, float | None]],
+        language: str | None = None
+    ) -> AsyncIterator[dict]:
+        """Transcribe a recording's chunks, yielding each with its position.
+        
+        Args:
+            sources: Audio files or upload tuples in playback order
+            spans: (start, length) in seconds of each chunk; a length of None
+                   means the duration is unknown
+            language: Optional language hint
+        
+        Yields:
+            Results in completion order, with 't_start', 't_end' and
+            'duration' taken from spans where known
+        """
+        results = self._iter_transcribe(sources, len(spans), language, spans)
+        async with aclosing(results):
+            async for result in results:
+                start, length = spans[result["index"]]
+                result["t_start"] = start
+                # Prefer the measured span; the response's duration covers
+                # audio whose length could not be read
+                if length is None:
+                    length = result.get("duration")
+                result["t_end"] = start + length if length is not None else None
+                result["duration"] = length
+                yield result
+    
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the service's event loop, starting it on first use.
+        
+        The loop is kept running, so the client's pooled connections survive
+        from one call to the next. Calls from several threads run side by
+        side on the same loop.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="transcription-loop",
+                    daemon=True
+                ).start()
+            return self._loop
+    
+    def _submit(self, awaitable: Awaitable) -> Future:
+        """Schedule an awaitable on the service's event loop."""
+        async def run():
+            return await awaitable
+        
+        return asyncio.run_coroutine_threadsafe(run(), self._get_loop())
+    
+    def _run(self, awaitable: Awaitable):
+        """Run an awaitable on the service's event loop and wait for its result."""
+        return self._submit(awaitable).result()
+    
+    def close(self):
+        """Close the client's pooled connections and stop the event loop.
+        
+        Call once no transcriptions are running, e.g. at interpreter exit.
+        """
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        
+        async def shutdown():
+            await self.client.close()
+            await loop.shutdown_default_executor()
+        
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=10)
+        except Exception as e:
+            logger.warning(f"Error closing transcription client: {e}")
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+    
+    def _prepare_sources(
+        self,
+        audio_data: bytes | BinaryIO,
+        file_extension: str
+    ) -> tuple[Path | None, Iterable, list[tuple[float, float | None]]]:
+        """Get audio ready for upload, compressing and splitting it if too large.
+        
+        Args:
+            audio_data: Raw audio file bytes, or a seekable binary file object
+            file_extension: Audio file extension
+        
+        Returns:
+            (work_dir, sources, spans): the temporary directory to remove
+            afterwards (None if nothing was written to disk), the upload
+            sources in playback order, and the (start, length) of each
+        """
+        # Measure the audio without copying it
+        if isinstance(audio_data, bytes):
+            file_size = len(audio_data)
+        else:
+            audio_data.seek(0, os.SEEK_END)
+            file_size = audio_data.tell()
+            audio_data.seek(0)
+        
+        logger.info(f"📁 Transcribing audio: {file_size / 1024 / 1024:.2f}MB")
+        
+        # Check if we need to split the file
+        if file_size <= MAX_FILE_SIZE:
+            # Fits in one request: upload straight from memory, no temp file
+            filename = f"audio.{file_extension}"
+            content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            duration = self._get_audio_duration(audio_data)
+            return None, [(filename, audio_data, content_type)], [(0.0, duration)]
+        
+        logger.info(f"⚡ File exceeds {MAX_FILE_SIZE / 1024 / 1024}MB limit, compressing...")
+        # ffmpeg needs a seekable file on disk (m4a often keeps its index at the end).
+        # Everything written to disk for this call lives under one directory
+        work_dir = Path(tempfile.mkdtemp(prefix="tx-"))
+        try:
+            temp_path = work_dir / f"audio.{file_extension}"
+            with open(temp_path, "wb") as temp_file:
+                if isinstance(audio_data, bytes):
+                    temp_file.write(audio_data)
+                else:
+                    shutil.copyfileobj(audio_data, temp_file)
+            
+            # Compressed speech often fits in one request with no split
+            compressed_path = self._compress_audio(temp_path)
+            upload_path = compressed_path or temp_path
+            
+            plan = []
+            if upload_path.stat().st_size > MAX_FILE_SIZE:
+                logger.info("⚡ Still over the limit, splitting for parallel processing...")
+                plan = self._plan_chunks(upload_path, self.chunk_duration)
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        
+        if not plan:
+            return work_dir, [upload_path], [(0.0, self._get_audio_duration(upload_path))]
+        
+        # Chunks are uploaded while later ones are still being cut
+        return work_dir, self._iter_split_audio(upload_path, plan, work_dir), plan
+    
+    async def transcribe_stream(
+        self,
+        audio_data: bytes | BinaryIO,
+        file_extension: str = "m4a",
+        language: str | None = None,
+    ) -> AsyncIterator[dict]:
+        """Transcribe audio, yielding each chunk's transcript as soon as it is ready.
+        
+        Can be iterated from any event loop; the uploads themselves run on
+        the service's own loop. Chunks arrive in completion order, not
+        playback order, and overlapping seams are not merged. If you stop
+        iterating early, close the generator (e.g. with contextlib.aclosing)
+        so remaining uploads are cancelled and temp files removed.
+        
+        Args:
+            audio_data: Raw audio file bytes, or a seekable binary file object
+                        holding the audio (read from its start)
+            file_extension: Audio file extension (default: m4a for LINE)
+            language: Optional language hint (e.g., 'zh' for Chinese, 'en' for English)
+        
+        Yields:
+            Dictionary per chunk with 'index', 'text', 't_start' and 't_end'
+            (seconds into the recording), plus 'language' and 'duration'
+        """
+        work_dir, sources, spans = await asyncio.to_thread(
+            self._prepare_sources, audio_data, file_extension
+        )
+        chunks = self._stream_chunks(sources, spans, language)
+        try:
+            while (result := await asyncio.wrap_future(self._submit(anext(chunks, None)))) is not None:
+                yield result
+        finally:
+            await asyncio.wrap_future(self._submit(chunks.aclose()))
+            if work_dir is not None:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    
     def transcribe(
         self,
-        audio_data: bytes,
+        audio_data: bytes | BinaryIO,
         file_extension: str = "m4a",
         language: str | None = None,
+        on_quota_wait: Callable[[float], None] | None = None,
     ) -> dict:
         """Transcribe audio data to text. Handles large files with PARALLEL processing.
         
         Args:
-            audio_data: Raw audio file bytes
+            audio_data: Raw audio file bytes, or a seekable binary file object
+                        holding the audio (read from its start)
             file_extension: Audio file extension (default: m4a for LINE)
             language: Optional language hint (e.g., 'zh' for Chinese, 'en' for English)
                      If not specified, Whisper auto-detects the language.
+            on_quota_wait: Optional callback given the estimated wait in seconds
+                           when the rate-limit quota will hold up the start by
+                           at least QUOTA_NOTICE_SECONDS
         
         Returns:
             Dictionary with 'text' (transcript) and 'language' (detected language)
         """
-        # Save audio to temp file
-        with tempfile.NamedTemporaryFile(
-            suffix=f".{file_extension}",
-            delete=False
-        ) as temp_file:
-            temp_file.write(audio_data)
-            temp_path = Path(temp_file.name)
-        
-        file_size = len(audio_data)
-        logger.info(f"📁 Transcribing audio: {file_size / 1024 / 1024:.2f}MB")
-        
-        chunks_to_cleanup = []
+        work_dir = None
         
         try:
-            # Check if we need to split the file
-            if file_size > MAX_FILE_SIZE:
-                logger.info(f"⚡ File exceeds {MAX_FILE_SIZE / 1024 / 1024}MB limit, splitting for parallel processing...")
-                chunk_paths = self._split_audio(temp_path)
-                chunks_to_cleanup = [p for p in chunk_paths if p != temp_path]
-            else:
-                chunk_paths = [temp_path]
-            
-            total_chunks = len(chunk_paths)
+            work_dir, sources, spans = self._prepare_sources(audio_data, file_extension)
+            total_chunks = len(spans)
             
-            # PARALLEL TRANSCRIPTION
             if total_chunks > 1:
                 logger.info(f"🚀 Processing {total_chunks} chunks in PARALLEL...")
-                results = []
-                
-                with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                    # Submit all chunks for parallel processing
-                    future_to_index = {
-                        executor.submit(
-                            self._transcribe_single, 
-                            chunk_path, 
-                            i, 
-                            total_chunks, 
-                            language
-                        ): i
-                        for i, chunk_path in enumerate(chunk_paths)
-                    }
-                    
-                    # Collect results as they complete
-                    for future in as_completed(future_to_index):
-                        chunk_index = future_to_index[future]
-                        try:
-                            result = future.result()
-                            results.append(result)
-                        except Exception as e:
-                            logger.error(f"❌ Chunk {chunk_index} failed: {e}")
-                            results.append({
-                                "index": chunk_index,
-                                "text": f"[Chunk {chunk_index + 1} failed: {str(e)[:50]}]",
-                                "language": "unknown",
-                                "duration": None
-                            })
-                
-                # Sort by index to maintain order
-                results.sort(key=lambda x: x["index"])
-                
-            else:
-                # Single file, no parallel needed
-                results = [self._transcribe_single(chunk_paths[0], 0, 1, language)]
             
-            # Combine all transcripts
-            all_transcripts = [r["text"] for r in results]
-            full_transcript = "\n\n".join(all_transcripts)
+            # Earlier large jobs can leave the quota in debt; say so up front
+            first_seconds = max(spans[0][1] or 0.0, MIN_BILLED_AUDIO_SECONDS)
+            quota_wait = max(self._request_bucket.wait_time(), self._audio_bucket.wait_time(first_seconds))
+            if quota_wait >= QUOTA_NOTICE_SECONDS:
+                logger.warning(f"⏳ Rate-limit quota used up, starting in about {quota_wait:.0f}s")
+                if on_quota_wait is not None:
+                    on_quota_wait(quota_wait)
+            
+            # Chunks arrive in completion order, at most CHUNK_WINDOW ahead;
+            # each seam is merged once the chunks on both sides are in, and
+            # the settled text is joined once at the end
+            chunks = self._stream_chunks(sources, spans, language)
+            waiting = {}
+            next_index = 0
+            results = []
+            parts = []
+            pending = None
+            try:
+                while (result := self._run(anext(chunks, None))) is not None:
+                    waiting[result["index"]] = result
+                    while next_index in waiting:
+                        result = waiting.pop(next_index)
+                        next_index += 1
+                        if pending is None:
+                            pending = result["text"]
+                        else:
+                            head, pending = _merge_overlap(pending, result["text"])
+                            parts.append(head)
+                        
+                        # Keep only the small per-chunk details for the totals
+                        results.append({"language": result["language"], "duration": result["duration"]})
+            finally:
+                self._run(chunks.aclose())
+            
+            parts.append(pending)
+            full_transcript = "".join(parts)
             
-            # Calculate totals
+            # Calculate totals (overlapping seconds were transcribed twice)
             total_duration = sum(r.get("duration") or 0 for r in results)
+            total_duration -= CHUNK_OVERLAP * (len(results) - 1)
             detected_language = next(
                 (r["language"] for r in results if r.get("language") != "unknown"),
                 "unknown"
@@ -312,21 +1049,6 @@ class TranscriptionService:
             raise
             
         finally:
-            # Clean up temp files
-            try:
-                temp_path.unlink()
-            except Exception:
-                pass
-            
-            for chunk in chunks_to_cleanup:
-                try:
-                    chunk.unlink()
-                except Exception:
-                    pass
-            
-            # Clean up chunk temp directory
-            for chunk in chunks_to_cleanup:
-                try:
-                    chunk.parent.rmdir()
-                except Exception:
-                    pass
+            # Clean up the input copy, compressed audio and chunks in one go
+            if work_dir is not None:
+                shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,14 @@
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Make the app's top-level packages importable from the tests
+sys.path.insert(0, str(ROOT))
+
+# Import service modules on their own, without services/__init__.py pulling
+# in every SDK the other services need
+services = types.ModuleType("services")
+services.__path__ = [str(ROOT / "services")]
+sys.modules.setdefault("services", services)
@@ -0,0 +1,140 @@
+"""Tests for transcribing split recordings chunk by chunk."""
+import asyncio
+import tempfile
+import time
+
+import pytest
+
+for module in ("groq", "httpx", "mutagen"):
+    pytest.importorskip(module)
+
+from services import transcription
+from services.transcription import TranscriptionService
+
+
+def chunk_source(index):
+    return (f"chunk_{index:03d}.ogg", f"audio {index}".encode(), "audio/ogg")
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """A service whose uploads are stubbed out, each taking delays[index] seconds."""
+    service = TranscriptionService("test-key", max_workers=2)
+    service.delays = {}
+    service.started = []
+    service.in_flight = set()
+    service.max_ahead = 0
+    
+    async def transcribe_single(client, source, index, total_chunks, language=None, audio_seconds=None):
+        service.started.append(index)
+        service.in_flight.add(index)
+        service.max_ahead = max(service.max_ahead, index - min(service.in_flight))
+        await asyncio.sleep(service.delays.get(index, 0.001))
+        service.in_flight.discard(index)
+        return {"index": index, "text": f"part{index}", "language": "english", "duration": None}
+    
+    monkeypatch.setattr(service, "_transcribe_single", transcribe_single)
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def presplit(service, monkeypatch):
+    """Hand the service chunk_count in-memory chunks without touching ffmpeg."""
+    def prepare_sources(audio_data, file_extension):
+        count = service.chunk_count
+        return None, [chunk_source(i) for i in range(count)], [(i * 10.0, 10.0) for i in range(count)]
+    
+    monkeypatch.setattr(service, "_prepare_sources", prepare_sources)
+    return service
+
+
+@pytest.fixture
+def split_on_disk(service, monkeypatch, tmp_path):
+    """Route recordings through the real temp-dir split path with stand-in cutting."""
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(transcription, "MAX_FILE_SIZE", 4)
+    service.chunk_count = 20
+    service.cut = []
+    
+    def plan_chunks(file_path, chunk_duration):
+        return [(i * 10.0, 10.0) for i in range(service.chunk_count)]
+    
+    def iter_split_audio(file_path, plan, output_dir):
+        for i, _ in enumerate(plan):
+            time.sleep(0.01)
+            chunk_path = output_dir / f"chunk_{i:03d}.ogg"
+            chunk_path.write_bytes(f"audio {i}".encode())
+            service.cut.append(i)
+            yield chunk_path
+    
+    monkeypatch.setattr(service, "_compress_audio", lambda file_path: None)
+    monkeypatch.setattr(service, "_plan_chunks", plan_chunks)
+    monkeypatch.setattr(service, "_iter_split_audio", iter_split_audio)
+    return tmp_path
+
+
+def test_out_of_order_chunks_are_merged_in_playback_order(presplit):
+    presplit.chunk_count = 4
+    presplit.delays = {0: 0.05, 1: 0.03}
+    
+    result = presplit.transcribe(b"audio")
+    
+    assert result["text"] == "part0\n\npart1\n\npart2\n\npart3"
+    assert result["duration"] == pytest.approx(40.0 - 3 * transcription.CHUNK_OVERLAP)
+
+
+def test_uploads_stay_within_the_window(presplit, monkeypatch):
+    monkeypatch.setattr(transcription, "CHUNK_WINDOW", 5)
+    presplit.chunk_count = 20
+    # The first chunk is slow, so later ones pile up behind it
+    presplit.delays = {0: 0.1}
+    
+    result = presplit.transcribe(b"audio")
+    
+    assert result["text"].split("\n\n") == [f"part{i}" for i in range(20)]
+    assert sorted(presplit.started) == list(range(20))
+    assert presplit.max_ahead < 5
+
+
+def test_stream_yields_chunks_in_completion_order(presplit):
+    presplit.chunk_count = 3
+    presplit.delays = {0: 0.1}
+    
+    async def collect():
+        return [result async for result in presplit.transcribe_stream(b"audio")]
+    
+    results = asyncio.run(collect())
+    
+    assert [result["index"] for result in results] == [1, 2, 0]
+    assert [(result["t_start"], result["t_end"]) for result in results] == [
+        (10.0, 20.0), (20.0, 30.0), (0.0, 10.0)
+    ]
+
+
+def test_stream_removes_its_work_dir(service, split_on_disk):
+    async def collect():
+        return [result async for result in service.transcribe_stream(b"long audio")]
+    
+    results = asyncio.run(collect())
+    
+    assert sorted(result["index"] for result in results) == list(range(20))
+    assert not list(split_on_disk.glob("tx-*"))
+
+
+def test_closing_stream_early_stops_work_and_cleans_up(service, split_on_disk):
+    service.delays = {i: 0.05 for i in range(20)}
+    
+    async def first_result():
+        stream = service.transcribe_stream(b"long audio")
+        result = await anext(stream)
+        assert list(split_on_disk.glob("tx-*"))
+        await stream.aclose()
+        return result
+    
+    result = asyncio.run(first_result())
+    
+    assert result["index"] in (0, 1)
+    assert not list(split_on_disk.glob("tx-*"))
+    assert len(service.started) < 20
+    assert len(service.cut) < 20
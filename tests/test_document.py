@@ -0,0 +1,34 @@
+"""Tests for splitting long text into LINE messages."""
+from services.document import DocumentGenerator
+
+generator = DocumentGenerator()
+
+
+def test_short_text_is_one_message():
+    assert generator.split_for_line("hello\nworld", max_length=100) == ["hello\nworld"]
+
+
+def test_lines_are_grouped_up_to_the_limit():
+    text = "\n".join(["x" * 30] * 10)
+    chunks = generator.split_for_line(text, max_length=100)
+    
+    assert len(chunks) == 4
+    assert all(chunk.count("x" * 30) <= 3 for chunk in chunks)
+
+
+def test_long_line_is_wrapped_at_spaces():
+    words = [f"word{i}" for i in range(100)]
+    chunks = generator.split_for_line(" ".join(words), max_length=100)
+    
+    bodies = [chunk.split("\n\n", 1)[1] for chunk in chunks]
+    assert all(len(body) <= 100 for body in bodies)
+    assert " ".join(" ".join(bodies).split()) == " ".join(words)
+
+
+def test_long_line_without_spaces_is_cut():
+    text = "我們今天討論預算的問題" * 50
+    chunks = generator.split_for_line(text, max_length=100)
+    
+    bodies = [chunk.split("\n\n", 1)[1] for chunk in chunks]
+    assert all(len(body) <= 100 for body in bodies)
+    assert "".join(bodies) == text
@@ -0,0 +1,54 @@
+"""Tests for merging overlapping chunk transcripts at their seams."""
+import pytest
+
+for module in ("groq", "httpx", "mutagen"):
+    pytest.importorskip(module)
+
+from services.transcription import _merge_overlap
+
+
+def merge(prev: str, curr: str) -> str:
+    head, tail = _merge_overlap(prev, curr)
+    return head + tail
+
+
+def test_shared_words_at_seam_are_kept_once():
+    prev = "So for the budget we agreed to revisit it next week okay"
+    curr = "week okay so the next item is the hiring plan"
+    
+    assert merge(prev, curr) == (
+        "So for the budget we agreed to revisit it next "
+        "week okay so the next item is the hiring plan"
+    )
+
+
+def test_common_phrase_away_from_seam_is_not_an_overlap():
+    prev = "So for the budget we agreed to revisit it next week okay"
+    curr = "week okay so the next item is the new project for the team"
+    merged = merge(prev, curr)
+    
+    assert merged.startswith("So for the budget we agreed to revisit it next")
+    assert merged.endswith("the new project for the team")
+
+
+def test_unrelated_chunks_are_joined_whole():
+    prev = "So for the budget we agreed to revisit it next week"
+    curr = "Moving on the new project for the team starts in May"
+    
+    assert merge(prev, curr) == prev + "\n\n" + curr
+
+
+def test_short_cjk_run_is_not_an_overlap():
+    prev = "我們今天討論預算的問題，下週我們再來看一次進度好嗎"
+    curr = "好嗎那接下來我們討論新的專案"
+    merged = merge(prev, curr)
+    
+    assert "再來看一次進度好嗎" in merged
+    assert "好嗎那接下來" in merged
+
+
+def test_cjk_overlap_is_kept_once():
+    prev = "我們今天討論預算的問題，下週再來看一次進度"
+    curr = "看一次進度，那接下來我們討論新的專案"
+    
+    assert merge(prev, curr) == "我們今天討論預算的問題，下週再來看一次進度，那接下來我們討論新的專案"
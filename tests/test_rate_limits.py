@@ -0,0 +1,124 @@
+"""Tests for Groq rate-limit parsing, retry delays and quota pacing."""
+import asyncio
+import time
+
+import pytest
+
+for module in ("groq", "httpx", "mutagen"):
+    pytest.importorskip(module)
+
+import httpx
+from groq import APIConnectionError
+
+from services import transcription
+from services.transcription import TranscriptionService, _parse_reset_seconds, _TokenBucket
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("12", 12.0),
+    ("7.66s", 7.66),
+    ("2m59.56s", 179.56),
+    ("500ms", 0.5),
+    ("1h2m", 3720.0),
+])
+def test_parse_reset_seconds(value, expected):
+    assert _parse_reset_seconds(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", [None, "", "1.2.3s", "5x", "s", "2m59.56"])
+def test_parse_reset_seconds_rejects_malformed_values(value):
+    assert _parse_reset_seconds(value) is None
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(transcription.random, "random", lambda: 0.0)
+
+
+def test_retry_delay_prefers_retry_after(no_jitter):
+    headers = {"retry-after": "3", "x-ratelimit-reset-requests": "2m59.56s"}
+    
+    assert TranscriptionService._retry_delay(headers, 0) == 3.0
+
+
+def test_retry_delay_falls_back_to_reset_header(no_jitter):
+    headers = {"x-ratelimit-reset-requests": "2m59.56s"}
+    
+    assert TranscriptionService._retry_delay(headers, 0) == pytest.approx(179.56)
+
+
+def test_retry_delay_backs_off_exponentially_up_to_a_cap(no_jitter):
+    delays = [TranscriptionService._retry_delay({}, attempt) for attempt in range(8)]
+    
+    assert delays[:3] == [transcription.RETRY_BASE_DELAY * 2 ** n for n in range(3)]
+    assert max(delays) == transcription.RETRY_MAX_DELAY
+
+
+def test_retry_delay_adds_bounded_jitter():
+    delays = {TranscriptionService._retry_delay({"retry-after": "3"}, 0) for _ in range(20)}
+    
+    assert all(3.0 <= delay < 3.0 + transcription.RETRY_JITTER for delay in delays)
+    assert len(delays) > 1
+
+
+def test_token_bucket_wait_time():
+    bucket = _TokenBucket(capacity=10, period=10)
+    assert bucket.wait_time(1) == 0.0
+    
+    bucket._tokens = 0.0
+    bucket._updated = time.monotonic()
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+    # More than capacity waits only for a full bucket
+    assert bucket.wait_time(100) == pytest.approx(10.0, abs=0.05)
+    
+    bucket.pause(30)
+    assert bucket.wait_time(1) == pytest.approx(30.0, abs=0.05)
+
+
+class _FlakyTranscriptions:
+    """Fails with a connection error a set number of times, then succeeds."""
+    
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.with_raw_response = self
+    
+    async def create(self, **params):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.groq.com"))
+        return _RawResponse()
+
+
+class _RawResponse:
+    headers = {}
+    
+    def parse(self):
+        return type("Transcription", (), {"text": "hello", "language": "english", "duration": 5.0})()
+
+
+class _FlakyClient:
+    def __init__(self, failures):
+        self.audio = type("Audio", (), {})()
+        self.audio.transcriptions = _FlakyTranscriptions(failures)
+
+
+def test_connection_errors_are_retried(no_jitter, monkeypatch):
+    monkeypatch.setattr(transcription, "RETRY_BASE_DELAY", 0.0)
+    service = TranscriptionService("test-key")
+    client = _FlakyClient(failures=2)
+    
+    result = asyncio.run(service._transcribe_single(client, ("a.m4a", b"audio", "audio/mp4"), 0, 1))
+    
+    assert result["text"] == "hello"
+    assert client.audio.transcriptions.calls == 3
+
+
+def test_connection_errors_give_up_after_max_retries(no_jitter, monkeypatch):
+    monkeypatch.setattr(transcription, "RETRY_BASE_DELAY", 0.0)
+    service = TranscriptionService("test-key")
+    client = _FlakyClient(failures=5)
+    
+    with pytest.raises(APIConnectionError):
+        asyncio.run(service._transcribe_single(client, ("a.m4a", b"audio", "audio/mp4"), 0, 1, max_retries=2))
+    assert client.audio.transcriptions.calls == 3
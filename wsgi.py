@@ -0,0 +1,11 @@
+"""WSGI entry point for production servers.
+
+Run with: gunicorn -k gthread --workers 1 --threads 16 wsgi:app
+
+Keep a single worker: the redelivery dedup table, pending !nocache flags
+and today's authenticated users all live in process memory, so a second
+worker would not see them.
+"""
+from app import app
+
+__all__ = ["app"]